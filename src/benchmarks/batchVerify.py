@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+import argparse
+from pathlib import Path
+from collections import Counter
+
+# Verifies many Groth16 ballot proofs for the same verification key.
+# The proof/public pairs are distributed across several worker processes (../scripts/snarkjs/batchVerify.js) that each load the
+# verification key once and check the proofs with randomized batch verification.
+
+BATCH_VERIFIER = Path(__file__).resolve().parent.parent / "scripts" / "snarkjs" / "batchVerify.js"
+SCALAR_FIELD_ORDER = 21888242871839275222246405745257275088548364400416034343698204186575808495617 # Order of the BN254 scalar field
+BASE_FIELD_ORDER = 21888242871839275222246405745257275088696311157297823662689037894645226208583 # Order of the BN254 base field
+
+# ========================================================================================================================
+# 1. Collect proof/public pairs
+
+def public_file_for(proof_file):
+    """
+    Returns the public signals file belonging to a proof file (proof.json -> public.json, <name>.proof.json -> <name>.public.json).
+    """
+    name = proof_file.name
+    index = name.rfind("proof")
+    return proof_file.with_name(name[:index] + "public" + name[index + len("proof"):])
+
+def read_directory(directory):
+    """
+    Yields all proof/public pairs in the directory (including subdirectories).
+    Pairs that cannot be read are yielded as {"id": ..., "error": ...} so that they are reported as invalid.
+    """
+    for proof_file in sorted(Path(directory).rglob("*proof.json")):
+        entry_id = str(proof_file.relative_to(directory))
+        public_file = public_file_for(proof_file)
+        try:
+            with proof_file.open() as f:
+                proof = json.load(f)
+            with public_file.open() as f:
+                public_signals = json.load(f)
+        except (OSError, ValueError) as e:
+            yield {"id": entry_id, "error": f"Proof/public pair could not be read: {e}"}
+            continue
+        yield {"id": entry_id, "proof": proof, "public": public_signals}
+
+def read_stream(stream):
+    """
+    Yields the proof/public pairs of a stream with one JSON object {"id": ..., "proof": {...}, "public": [...]} per line.
+    Lines that cannot be parsed are yielded as {"id": <line number>, "error": ...}.
+    """
+    for line_number, line in enumerate(stream, 1):
+        if line.strip() != "":
+            try:
+                entry = json.loads(line)
+                if not isinstance(entry, dict):
+                    raise ValueError("Expected a JSON object.")
+            except ValueError as e:
+                yield {"id": str(line_number), "error": f"Line could not be parsed: {e}"}
+                continue
+            entry.setdefault("id", str(line_number))
+            yield entry
+
+# ========================================================================================================================
+# 2. Verify
+
+def node_environment():
+    # Make the dependencies of the globally installed snarkjs available to the batch verifier
+    env = os.environ.copy()
+    global_root = subprocess.run("npm root -g", shell=True, capture_output=True, text=True).stdout.strip()
+    node_paths = [global_root, os.path.join(global_root, "snarkjs", "node_modules")]
+    env["NODE_PATH"] = os.pathsep.join(node_paths + ([env["NODE_PATH"]] if env.get("NODE_PATH") else []))
+    return env
+
+def collect_results(worker, results):
+    for line in worker.stdout:
+        try:
+            result = json.loads(line)
+            if not isinstance(result, dict) or "id" not in result or "valid" not in result:
+                raise ValueError("Expected a JSON object with id and valid.")
+            results.append(result)
+        except ValueError:
+            # Stray output (e.g., a warning of a dependency), the affected proofs are reported as unverified
+            print(f"Warning: Ignoring unparsable batch verifier output: {line.rstrip()}", file=sys.stderr)
+
+def batch_verify(verification_key, entries, n_workers=os.cpu_count(), batch_size=64):
+    """
+    Distributes the entries round-robin across n_workers worker processes and returns the verification result of every entry.
+    Entries that could not be read and entries of a worker that terminated before reporting them are returned as invalid.
+    """
+    env = node_environment()
+    workers = []
+    for i in range(n_workers):
+        worker = subprocess.Popen(["node", str(BATCH_VERIFIER), str(verification_key), str(batch_size)], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env)
+        results = []
+        reader = threading.Thread(target=collect_results, args=(worker, results))
+        reader.start()
+        workers.append({"process": worker, "reader": reader, "results": results, "sent": [], "alive": True})
+
+    all_results = []
+    worker_index = 0
+    for entry in entries:
+        if "error" in entry:
+            all_results.append({"id": entry["id"], "valid": False, "error": entry["error"]})
+            continue
+        alive_workers = [worker for worker in workers if worker["alive"]]
+        if not alive_workers:
+            all_results.append({"id": entry["id"], "valid": False, "error": "All batch verifier workers terminated."})
+            continue
+        worker = alive_workers[worker_index % len(alive_workers)]
+        worker_index += 1
+        try:
+            worker["process"].stdin.write(json.dumps(entry) + "\n")
+            worker["sent"].append(entry["id"])
+        except BrokenPipeError:
+            # The worker terminated early, the entry is reported as invalid below
+            worker["alive"] = False
+            worker["sent"].append(entry["id"])
+
+    for worker in workers:
+        try:
+            worker["process"].stdin.close()
+        except BrokenPipeError:
+            pass
+        worker["reader"].join()
+        return_code = worker["process"].wait()
+        all_results += worker["results"]
+        unreported = Counter(worker["sent"]) - Counter(result["id"] for result in worker["results"])
+        if return_code != 0:
+            print(f"Error: Batch verifier exited with return code {return_code}, {sum(unreported.values())} of its proofs were not verified.")
+        for entry_id in unreported.elements():
+            all_results.append({"id": entry_id, "valid": False, "error": f"Batch verifier terminated with return code {return_code} before verifying the proof."})
+    return all_results
+
+def verify(verification_key, input_path, n_workers, batch_size):
+    entries = read_stream(sys.stdin) if input_path == "-" else read_directory(input_path)
+
+    start_time = time.time()
+    results = batch_verify(verification_key, entries, n_workers, batch_size)
+    end_time = time.time()
+
+    invalid = sorted((result for result in results if not result["valid"]), key=lambda result: str(result["id"]))
+    for result in invalid:
+        print(f"Invalid: {result['id']} ({result.get('error')})")
+
+    t_ver = int((end_time - start_time) * 1000)
+    ballots_per_second = len(results) / (end_time - start_time) if end_time > start_time else 0
+    print(f"Verified {len(results)} ballot proofs ({len(results) - len(invalid)} valid, {len(invalid)} invalid) in {t_ver} milliseconds with {n_workers} workers.")
+    print(f"{ballots_per_second:.2f} ballots verified per second.")
+    return invalid
+
+# ========================================================================================================================
+# 3. Generate test set
+
+def tamper(proof, public_signals, variant):
+    """
+    Returns a copy of the proof and public signals that must not verify.
+    """
+    proof = json.loads(json.dumps(proof))
+    public_signals = list(public_signals)
+    if variant == "publicSignal" and len(public_signals) > 0:
+        public_signals[0] = str((int(public_signals[0]) + 1) % SCALAR_FIELD_ORDER)
+    elif variant == "swappedPoints":
+        proof["pi_a"], proof["pi_c"] = proof["pi_c"], proof["pi_a"]
+    else: # notOnCurve
+        proof["pi_a"][0] = str((int(proof["pi_a"][0]) + 1) % BASE_FIELD_ORDER)
+    return proof, public_signals
+
+def generate_test_set(source_dir, output_dir, n_valid, n_tampered):
+    """
+    Writes n_valid valid proofs and n_tampered tampered proofs to output_dir.
+    Both are taken round-robin from the valid proof/public pairs in source_dir, which should contain several distinct proofs
+    (e.g., from repeated snarkjs groth16 prove runs for different ballots) so that batches combine distinct proofs and public signals.
+    """
+    sources = [entry for entry in read_directory(source_dir) if "error" not in entry]
+    if not sources:
+        print(f"Error: '{source_dir}' does not contain any readable proof/public pairs.")
+        sys.exit(1)
+    if len(sources) == 1:
+        print("Warning: Only one source proof found. All valid proofs of the test set are identical.")
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    variants = ["publicSignal", "swappedPoints", "notOnCurve"]
+    test_cases = []
+    for i in range(n_valid):
+        source = sources[i % len(sources)]
+        test_cases.append((f"valid_{i:05d}", source["proof"], source["public"]))
+    for i in range(n_tampered):
+        source = sources[i % len(sources)]
+        variant = variants[i % len(variants)]
+        test_cases.append((f"tampered_{i:05d}_{variant}", *tamper(source["proof"], source["public"], variant)))
+
+    for name, test_proof, test_public_signals in test_cases:
+        (output_path / f"{name}.proof.json").write_text(json.dumps(test_proof, indent=1))
+        (output_path / f"{name}.public.json").write_text(json.dumps(test_public_signals, indent=1))
+    print(f"Wrote {n_valid} valid and {n_tampered} tampered proofs based on {len(sources)} source proofs to '{output_path}'.")
+
+# ========================================================================================================================
+# MAIN
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch verification of Groth16 ballot proofs for one verification key.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    verify_parser = subparsers.add_parser("verify", help="Verify all proof/public pairs of a directory or stream")
+    verify_parser.add_argument("verificationKey", help="Verification key (JSON) shared by all proofs")
+    verify_parser.add_argument("input", help="Directory containing proof.json/public.json or <name>.proof.json/<name>.public.json pairs, or - to read one JSON object {\"id\", \"proof\", \"public\"} per line from stdin")
+    verify_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of parallel worker processes")
+    verify_parser.add_argument("--batch-size", type=int, default=64, help="Number of proofs combined into one randomized batch check")
+
+    test_set_parser = subparsers.add_parser("testset", help="Generate valid and tampered proofs from several valid proofs")
+    test_set_parser.add_argument("sourceDir", help="Directory with valid proof/public pairs (same layout as for verify), ideally several distinct proofs")
+    test_set_parser.add_argument("outputDir", help="Directory the generated proofs are written to")
+    test_set_parser.add_argument("--valid", type=int, default=100, help="Number of valid proofs")
+    test_set_parser.add_argument("--tampered", type=int, default=10, help="Number of tampered proofs")
+
+    args = parser.parse_args()
+    if args.command == "verify":
+        invalid = verify(args.verificationKey, args.input, args.workers, args.batch_size)
+        sys.exit(1 if invalid else 0)
+    else:
+        generate_test_set(args.sourceDir, args.outputDir, args.valid, args.tampered)
+
+if __name__ == "__main__":
+    main()
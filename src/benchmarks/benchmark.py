@@ -5,6 +5,7 @@ import time
 from pathlib import Path
 import json
 from JSON import JSONUtils
+from constraintProfile import profile_circuit, export_profile
 import re
 import math
 import argparse
@@ -68,21 +69,27 @@ def capitalize_first_letter(string):
 # Check for the required arguments
 def validate_args(args):
     if len(args) < 4:
-        print("Usage: benchmark.py [<input>] <snark> <mode> <ellipticCurve> <electionType> <nBits> key1=value1 key2=value2 ...")
+        print("Usage: benchmark.py [--profile] [<input>] <snark> <mode> <ellipticCurve> <electionType> <nBits> key1=value1 key2=value2 ...")
         print("<input> is an optional argument")
+        print("--profile additionally attributes the constraints to the components and templates of the circuit")
         print("Allowed values for <snark>: groth16, plonk, fflonk")
         print("Allowed values for <mode>: voting, encryption, combined")
         sys.exit(1)
 
 # Assign input arguments to variables
 def parse_arguments():
+    flag_parser = argparse.ArgumentParser(add_help=False)
+    flag_parser.add_argument("--profile", action="store_true")
+    flags, params = flag_parser.parse_known_args(sys.argv[1:])
+    profile = flags.profile
+    validate_args(params)
+
     input_file = None
-    param_start = 1
-    if sys.argv[1].endswith(".json"):
-        input_file = sys.argv[1]
-        param_start += 1
+    if params[0].endswith(".json"):
+        input_file = params[0]
+        params = params[1:]
 
-    snark, mode, elliptic_curve, election_type, n_bits, *kv_pairs = sys.argv[param_start:]
+    snark, mode, elliptic_curve, election_type, n_bits, *kv_pairs = params
     named_params = {}
     for arg in kv_pairs:
         if "=" in arg:
@@ -92,7 +99,7 @@ def parse_arguments():
             print(f"Error: Invalid argument '{arg}', expected key=value format.")
             sys.exit(1)
     n_digits =  str(math.ceil(int(n_bits)/math.log(TE_ENC_BASE, 2))) if elliptic_curve == "twistedEdwards" else n_bits
-    return input_file, snark, mode, elliptic_curve, election_type, n_bits, n_digits, named_params
+    return input_file, profile, snark, mode, elliptic_curve, election_type, n_bits, n_digits, named_params
 
 def prepare_directories(snark, elliptic_curve, election_type):
     base_path = Path(snark) / elliptic_curve / election_type
@@ -228,7 +235,7 @@ sage_import('../../../../../sage/ellipticCurves/curve', fromlist=['CurvePoint'])
 sage_import('../../../../../sage/ellipticCurves/Montgomery', fromlist=['MontgomeryAffinePoint', 'MontgomeryProjectivePoint'])
 sage_import('../../../../../sage/ellipticCurves/TwistedEdwards', fromlist=['TwistedEdwardsPoint'])
 
-Ballot.test({capitalize_first_letter(election_type)}Ballot, {capitalize_first_letter(elliptic_curve)}Point, {n_bits}, {named_params_string})
+Ballot.test({capitalize_first_letter(election_type)}Ballot, {capitalize_first_letter(elliptic_curve)}Point, {n_bits}, nWorkers={os.cpu_count()}, {named_params_string})
         """)
     print(f"Sage test file '{sage_file}' created successfully.")
 
@@ -255,6 +262,15 @@ def compile_circuit(base_path, file_prefix, snark, input_file):
     print("Witness generated successfully.")
     return int(non_linear_constraints), int(linear_constraints)
 
+# ========================================================================================================================
+# 4b. Attribute constraints to components and templates (optional)
+
+def profile_constraints(base_path, file_prefix, snark, elliptic_curve, mode, election_type):
+    circom_test_path = base_path / "circomTestFiles"
+    profile = profile_circuit(circom_test_path / f"{file_prefix}.circom", circom_test_path / f"{file_prefix}.r1cs", circom_test_path / f"{file_prefix}.sym")
+    profiles_path = Path(snark) / elliptic_curve / "results" / mode / "profiles" / election_type
+    export_profile(profile, profiles_path / file_prefix)
+
 # ========================================================================================================================
 # 5. Prepare proof
 
@@ -337,14 +353,15 @@ def cleanup(base_path):
 # MAIN
 
 def main():
-    validate_args(sys.argv[1:])
-    input_file, snark, mode, elliptic_curve, election_type, n_bits, n_digits, named_params = parse_arguments()
+    input_file, profile, snark, mode, elliptic_curve, election_type, n_bits, n_digits, named_params = parse_arguments()
     base_path = prepare_directories(snark, elliptic_curve, election_type)
     file_prefix = create_circom_file(base_path, mode, election_type, elliptic_curve, n_bits, n_digits, named_params)
     if input_file == None:
         create_sage_file(base_path, file_prefix, elliptic_curve, election_type, n_bits, named_params)
     non_linear_constraints, linear_constraints = compile_circuit(base_path, file_prefix, snark, input_file)
     constraints = non_linear_constraints + linear_constraints
+    if profile:
+        profile_constraints(base_path, file_prefix, snark, elliptic_curve, mode, election_type)
     t_prep, crs_size = prepare_proof(snark, base_path, file_prefix)
     t_prove = prove(snark, base_path, file_prefix)
     t_ver = verify_proof(snark, base_path, file_prefix)
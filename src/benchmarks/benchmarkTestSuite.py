@@ -1,35 +1,234 @@
 import json
 import sys
+import os
+import re
 import subprocess
+import hashlib
+import shlex
+import time
+import argparse
+from pathlib import Path
 
-testSuitePath = sys.argv[1]
 log_file = "benchmark.log"
+checkpoint_file = "benchmarkCheckpoints.json"
 separator= "=" * 100
 
-with open(log_file, "w") as f:
-    with open(testSuitePath) as testSuiteFile:
-        testSuite = json.load(testSuiteFile)
-        for test in testSuite:
-            commandStr = test.get("command")
-            if commandStr != None:
-                f.write("\n" + separator + "\n")
-                print("\n" + separator)
+# Sources that every benchmark depends on, independent of the election type (relative to src/benchmarks)
+TOOLCHAIN_FILES = [
+    "benchmark.py",
+    "constraintProfile.py",
+    "circomConfig.json",
+    "../scripts/genCircom.sh",
+    "../scripts/snarkjs/prepareProof.sh",
+]
+# Sources that are additionally used if the circuit input is generated with Sage
+SAGE_TOOLCHAIN_FILES = [
+    "../scripts/sageImport.py",
+    "../scripts/JSON.py",
+]
 
-                f.write(f"Executing: {commandStr}\n\n")
-                print(f"Executing: {commandStr}\n")
+CIRCOM_INCLUDE_PATTERN = re.compile(r'^\s*include\s+"([^"]+)"\s*;', re.MULTILINE)
+SAGE_IMPORT_PATTERN = re.compile(r"sage_import\(\s*'([^']+)'")
 
-                process = subprocess.Popen(
-                    commandStr, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
-                )
+# ========================================================================================================================
+# 1. Dependency resolution
 
-                # Read output line-by-line
-                for line in process.stdout:
-                    print(line, end="") # Print to terminal
-                    f.write(line) # Write to log file
+def parse_benchmark_command(command):
+    """
+    Extracts the optional input file and the circuit describing parameters from a benchmark.py command.
+    Raises a ValueError if the command is not a complete benchmark.py call.
+    """
+    args = shlex.split(command)
+    script_positions = [i for i, arg in enumerate(args) if arg.endswith("benchmark.py")]
+    if not script_positions:
+        raise ValueError(f"Command does not call benchmark.py: {command}")
+    args = args[script_positions[0] + 1:]
+    args = [arg for arg in args if not arg.startswith("--")] # Flags such as --profile
+    input_file = None
+    if args and args[0].endswith(".json"):
+        input_file = args[0]
+        args = args[1:]
+    if len(args) < 5:
+        raise ValueError(f"Incomplete benchmark.py call: {command}")
+    snark, mode, elliptic_curve, election_type, n_bits, *kv_pairs = args
+    named_params = dict(arg.split("=", 1) for arg in kv_pairs if "=" in arg)
+    return input_file, snark, mode, elliptic_curve, election_type, n_bits, named_params
 
+def collect_dependencies(entry_files, pattern, extension):
+    """
+    Collects the given files and, transitively, all files they include or import (relative to the including file).
+    """
+    dependencies = set()
+    pending = [Path(f).resolve() for f in entry_files]
+    while pending:
+        file = pending.pop()
+        if file in dependencies or not file.exists():
+            continue
+        dependencies.add(file)
+        for match in pattern.findall(file.read_text()):
+            dependency = match if match.endswith(extension) else match + extension
+            pending.append((file.parent / dependency).resolve())
+    return dependencies
 
-                process.wait() # Wait for the process to finish
+def test_dependencies(command):
+    """
+    Returns all files that influence the result of the benchmark run by the given command.
+    For commands that are no benchmark.py call, only the toolchain files are considered (the command itself is part of the test key).
+    """
+    dependencies = {Path(f).resolve() for f in TOOLCHAIN_FILES}
+    try:
+        input_file, snark, mode, elliptic_curve, election_type, n_bits, named_params = parse_benchmark_command(command)
+    except ValueError:
+        return dependencies
+    dependencies |= collect_dependencies([f"../circom/voting/{election_type}.circom"], CIRCOM_INCLUDE_PATTERN, ".circom")
+    if input_file == None:
+        # Mirrors the imports of the sage file generated by benchmark.py
+        sage_entry_files = [
+            "../sage/voting/ballot.sage",
+            f"../sage/voting/{election_type}.sage",
+            "../sage/ellipticCurves/curve.sage",
+            "../sage/ellipticCurves/Montgomery.sage",
+            "../sage/ellipticCurves/TwistedEdwards.sage",
+        ]
+        dependencies |= collect_dependencies(sage_entry_files, SAGE_IMPORT_PATTERN, ".sage")
+        dependencies |= {Path(f).resolve() for f in SAGE_TOOLCHAIN_FILES}
+    else:
+        dependencies.add(Path(input_file).resolve())
+    return dependencies
 
-            else:
+def hash_inputs(command, file_hash_cache):
+    """
+    Computes a hash over the contents of all files the benchmark depends on.
+    """
+    inputs_hash = hashlib.sha256()
+    for file in sorted(test_dependencies(command)):
+        if file not in file_hash_cache:
+            file_hash_cache[file] = hashlib.sha256(file.read_bytes()).hexdigest() if file.exists() else "missing"
+        inputs_hash.update(f"{os.path.relpath(file)}:{file_hash_cache[file]}\n".encode())
+    return inputs_hash.hexdigest()
+
+def test_key(test):
+    """
+    Identifies a test by its full parameter set (including the command).
+    """
+    return json.dumps(test, sort_keys=True)
+
+# ========================================================================================================================
+# 2. Checkpoint manifest
+
+def load_checkpoints(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_checkpoints(checkpoints, path):
+    # Write to a temporary file first so that a crash never leaves a corrupted manifest behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoints, f, indent=4)
+    os.replace(tmp_path, path)
+
+def result_exists(command):
+    """
+    Checks that the results file written by benchmark.py (see export_results) still contains the line of the benchmark.
+    """
+    try:
+        input_file, snark, mode, elliptic_curve, election_type, n_bits, named_params = parse_benchmark_command(command)
+    except ValueError:
+        return True # No results file to check
+    csv_file = Path(snark) / elliptic_curve / "results" / mode / f"{election_type}.csv"
+    indicator = f"{n_bits};{';'.join(named_params.values())}"
+    return csv_file.exists() and any(line.startswith(f"{indicator};") for line in csv_file.read_text().splitlines())
+
+def has_valid_result(checkpoints, key, inputs_hash, command):
+    checkpoint = checkpoints.get(key)
+    return checkpoint != None and checkpoint["status"] == "passed" and checkpoint["inputsHash"] == inputs_hash and result_exists(command)
+
+# ========================================================================================================================
+# 3. Run test suite
+
+def run_test(command_str, log):
+    log.write("\n" + separator + "\n")
+    print("\n" + separator)
+
+    log.write(f"Executing: {command_str}\n\n")
+    print(f"Executing: {command_str}\n")
+
+    process = subprocess.Popen(
+        command_str, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+
+    # Read output line-by-line
+    for line in process.stdout:
+        print(line, end="") # Print to terminal
+        log.write(line) # Write to log file
+    log.flush()
+
+    return process.wait() # Wait for the process to finish
+
+def run_test_suite(test_suite_path, fresh=False):
+    # The manifest is shared by all test suites, so it is always loaded and only the entries of this suite are updated
+    checkpoints = load_checkpoints(checkpoint_file)
+    file_hash_cache = {}
+    n_run, n_skipped, failed = 0, 0, []
+
+    # The log only covers the current run (skipped tests are listed with the time of the run they were checkpointed in)
+    with open(log_file, "w") as log:
+        header = f"Test suite {test_suite_path}, started {time.strftime('%Y-%m-%d %H:%M:%S')}" + (" (fresh)" if fresh else "")
+        print(header)
+        log.write(header + "\n")
+        with open(test_suite_path) as test_suite_file:
+            test_suite = json.load(test_suite_file)
+        for test in test_suite:
+            command_str = test.get("command")
+            if command_str == None:
                 raise SyntaxError("Test does not contain a command.")
 
+            key = test_key(test)
+            inputs_hash = hash_inputs(command_str, file_hash_cache)
+            if not fresh and has_valid_result(checkpoints, key, inputs_hash, command_str):
+                message = f"Skipping (unchanged since last successful run on {checkpoints[key]['finished']}): {command_str}"
+                print(message)
+                log.write(message + "\n")
+                n_skipped += 1
+                continue
+
+            start_time = time.time()
+            return_code = run_test(command_str, log)
+            n_run += 1
+            checkpoints[key] = {
+                "command": command_str,
+                "inputsHash": inputs_hash,
+                "status": "passed" if return_code == 0 else "failed",
+                "returnCode": return_code,
+                "duration [ms]": int((time.time() - start_time) * 1000),
+                "finished": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            save_checkpoints(checkpoints, checkpoint_file)
+            if return_code != 0:
+                failed.append(command_str)
+                message = f"Test failed with return code {return_code}, continuing with the remaining tests."
+                print(message)
+                log.write(message + "\n")
+
+        summary = f"\n{separator}\nRan {n_run} tests, skipped {n_skipped} unchanged tests, {len(failed)} failed.\n"
+        summary += "".join(f"Failed: {command_str}\n" for command_str in failed)
+        print(summary, end="")
+        log.write(summary)
+    return failed
+
+# ========================================================================================================================
+# MAIN
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs all benchmarks of a test suite. Tests whose parameters and input files are unchanged since their last successful run are skipped.")
+    parser.add_argument("testSuite", help="Path to the test suite (JSON)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore existing checkpoints and rerun all tests of the suite")
+    args = parser.parse_args()
+
+    failed = run_test_suite(args.testSuite, fresh=args.fresh)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
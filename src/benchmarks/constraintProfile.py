@@ -0,0 +1,283 @@
+import re
+import json
+import struct
+import argparse
+from pathlib import Path
+
+# Attributes the constraints and signals of a compiled circuit to the component instances and templates they belong to.
+# Signals are read from the .sym file, constraints from the .r1cs file (https://github.com/iden3/r1csfile/blob/master/doc/r1cs_bin_format.md).
+# Component instances are mapped to templates by parsing the circom sources the circuit includes.
+# A wire is owned by the deepest component instances among the signals sharing it, signals removed by the optimizer (witness index -1)
+# are only counted as signals.
+# A constraint is attributed to the deepest component instance owning one of its wires: with --O2, the inputs of a subcomponent are
+# replaced by the signals of the caller, so the constraints of a subcomponent usually reference wires of its ancestors.
+# Only if the deepest wires are owned by different sibling instances (e.g., a constraint combining the outputs of two subcomponents),
+# the constraint is attributed to their closest common ancestor.
+
+COMMENT_PATTERN = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+INCLUDE_PATTERN = re.compile(r'^\s*include\s+"([^"]+)"\s*;', re.MULTILINE)
+TEMPLATE_PATTERN = re.compile(r"\btemplate\s+(?:parallel\s+|custom\s+)?(\w+)\s*\([^)]*\)\s*\{")
+COMPONENT_DECLARATION_PATTERN = re.compile(r"\bcomponent\s+(\w+)")
+MAIN_COMPONENT_PATTERN = re.compile(r"\bcomponent\s+main\b[^=]*=\s*(\w+)\s*\(")
+ANONYMOUS_COMPONENT_PATTERN = re.compile(r"^(\w+)_\d+_\d+$")
+INDEX_PATTERN = re.compile(r"\[[^\]]*\]")
+
+# ========================================================================================================================
+# 1. Parse circom sources
+
+def read_circom_sources(circom_file):
+    """
+    Returns the comment free contents of the circom file and all files it includes (transitively).
+    """
+    sources = {}
+    pending = [Path(circom_file).resolve()]
+    while pending:
+        file = pending.pop()
+        if file in sources or not file.exists():
+            continue
+        sources[file] = COMMENT_PATTERN.sub("", file.read_text())
+        pending += [(file.parent / include).resolve() for include in INCLUDE_PATTERN.findall(sources[file])]
+    return sources
+
+def template_body(source, start):
+    """
+    Returns the body of the template whose opening brace is at position start - 1.
+    """
+    depth = 1
+    end = start
+    while depth > 0 and end < len(source):
+        if source[end] == "{":
+            depth += 1
+        elif source[end] == "}":
+            depth -= 1
+        end += 1
+    return source[start:end - 1]
+
+def parse_templates(sources):
+    """
+    Maps every template to a dictionary from the names of its subcomponents to the templates they instantiate.
+    Also returns the template of the main component.
+    """
+    templates = {}
+    main_template = None
+    for source in sources.values():
+        for match in TEMPLATE_PATTERN.finditer(source):
+            body = template_body(source, match.end())
+            components = {}
+            for name in COMPONENT_DECLARATION_PATTERN.findall(body):
+                assignment = re.search(rf"\b{name}\s*(?:\[[^\]]*\]\s*)*=\s*(\w+)\s*\(", body)
+                components[name] = assignment.group(1) if assignment else None
+            templates[match.group(1)] = components
+        main_match = MAIN_COMPONENT_PATTERN.search(source)
+        if main_match:
+            main_template = main_match.group(1)
+    return templates, main_template
+
+# ========================================================================================================================
+# 2. Read compiled circuit
+
+def read_sym(sym_file):
+    """
+    Returns a list of (witness index, component id, signal name) for every signal.
+    The witness index is -1 for signals removed by the optimizer.
+    """
+    signals = []
+    with open(sym_file) as f:
+        for line in f:
+            fields = line.strip().split(",", 3)
+            if len(fields) == 4:
+                signals.append((int(fields[1]), int(fields[2]), fields[3]))
+    return signals
+
+def read_r1cs_constraints(r1cs_file):
+    """
+    Yields the wires referenced by each constraint of the r1cs file.
+    """
+    data = Path(r1cs_file).read_bytes()
+    if data[:4] != b"r1cs":
+        raise ValueError(f"{r1cs_file} is not an r1cs file.")
+    n_sections = struct.unpack_from("<I", data, 8)[0]
+    sections = {}
+    position = 12
+    for i in range(n_sections):
+        section_type, section_size = struct.unpack_from("<IQ", data, position)
+        sections[section_type] = position + 12
+        position += 12 + section_size
+
+    header = sections[1]
+    field_size = struct.unpack_from("<I", data, header)[0]
+    n_constraints = struct.unpack_from("<I", data, header + 4 + field_size + 24)[0]
+
+    position = sections[2]
+    for i in range(n_constraints):
+        wires = set()
+        for linear_combination in range(3): # A, B, C
+            n_terms = struct.unpack_from("<I", data, position)[0]
+            position += 4
+            for j in range(n_terms):
+                wires.add(struct.unpack_from("<I", data, position)[0])
+                position += 4 + field_size
+        yield wires
+
+# ========================================================================================================================
+# 3. Attribute constraints and signals
+
+def component_path(signal_name, templates, main_template):
+    """
+    Splits a signal name into the path of the component instance it belongs to.
+    Returns the list of (instance name, template) pairs from the main component down to the owning component.
+    """
+    segments = signal_name.split(".")
+    path = [(segments[0], main_template)]
+    for segment in segments[1:-1]:
+        subcomponents = templates.get(path[-1][1]) or {}
+        name = INDEX_PATTERN.sub("", segment)
+        anonymous = ANONYMOUS_COMPONENT_PATTERN.match(name)
+        if name in subcomponents:
+            path.append((segment, subcomponents[name] or name))
+        elif anonymous and anonymous.group(1) in templates:
+            path.append((segment, anonymous.group(1)))
+        else:
+            break # Remaining segments belong to the signal (e.g., fields of a bus)
+    return tuple(path)
+
+def new_node(name, template):
+    return {"name": name, "template": template, "constraints": 0, "signals": 0, "wires": 0, "children": {}}
+
+def get_node(root, path):
+    node = root
+    for name, template in path[1:]:
+        if name not in node["children"]:
+            node["children"][name] = new_node(name, template)
+        node = node["children"][name]
+    return node
+
+def common_prefix(paths):
+    prefix = paths[0]
+    for path in paths[1:]:
+        length = 0
+        while length < min(len(prefix), len(path)) and prefix[length] == path[length]:
+            length += 1
+        prefix = prefix[:length]
+    return prefix
+
+def finalize(node, ancestor_templates=()):
+    """
+    Computes the inclusive counts of every node and converts the children to a list sorted by constraint count.
+    """
+    children = [finalize(child, ancestor_templates + (node["template"],)) for child in node["children"].values()]
+    node["totalConstraints"] = node["constraints"] + sum(child["totalConstraints"] for child in children)
+    node["totalSignals"] = node["signals"] + sum(child["totalSignals"] for child in children)
+    node["children"] = sorted(children, key=lambda child: child["totalConstraints"], reverse=True)
+    node["nestedInSameTemplate"] = node["template"] in ancestor_templates
+    return node
+
+def aggregate_templates(node, templates=None):
+    """
+    Flattens the hierarchy into per template counts.
+    Inclusive counts only consider instances that are not nested in an instance of the same template to avoid counting twice.
+    """
+    templates = {} if templates == None else templates
+    entry = templates.setdefault(node["template"], {"template": node["template"], "instances": 0, "constraints": 0, "totalConstraints": 0, "signals": 0, "totalSignals": 0})
+    entry["instances"] += 1
+    entry["constraints"] += node["constraints"]
+    entry["signals"] += node["signals"]
+    if not node["nestedInSameTemplate"]:
+        entry["totalConstraints"] += node["totalConstraints"]
+        entry["totalSignals"] += node["totalSignals"]
+    for child in node["children"]:
+        aggregate_templates(child, templates)
+    return templates
+
+def profile_circuit(circom_file, r1cs_file, sym_file):
+    templates, main_template = parse_templates(read_circom_sources(circom_file))
+    root = new_node("main", main_template)
+
+    # All signals of a component share its id (#c column), so the instance path is derived once per component.
+    # The shortest candidate is used since trailing segments of a signal name may be fields of a bus instead of subcomponents.
+    signals = read_sym(sym_file)
+    component_paths = {}
+    for witness, component, signal_name in signals:
+        path = component_path(signal_name, templates, main_template)
+        if component not in component_paths or len(path) < len(component_paths[component]):
+            component_paths[component] = path
+
+    # A wire shared by several signals (e.g., an input of a subcomponent linked to a signal of the caller) is owned by
+    # the deepest components among them, which may be several siblings (e.g., a signal passed to two subcomponents)
+    wire_owners = {}
+    for witness, component, signal_name in signals:
+        path = component_paths[component]
+        get_node(root, path)["signals"] += 1
+        if witness < 0:
+            continue # Removed by the optimizer, no wire to own
+        owners = wire_owners.get(witness)
+        if owners == None or len(path) > len(next(iter(owners))):
+            wire_owners[witness] = {path}
+        elif len(path) == len(next(iter(owners))):
+            owners.add(path)
+    for owners in wire_owners.values():
+        get_node(root, min(owners))["wires"] += 1
+
+    n_constraints = 0
+    for wires in read_r1cs_constraints(r1cs_file):
+        owner_sets = [wire_owners[wire] for wire in wires if wire != 0 and wire in wire_owners] # Wire 0 is the constant 1
+        depth = max((len(next(iter(owners))) for owners in owner_sets), default=1)
+        deepest = [owners for owners in owner_sets if len(next(iter(owners))) == depth]
+        shared = set.intersection(*deepest) if deepest else set()
+        if shared:
+            path = min(shared)
+        elif deepest:
+            path = common_prefix(sorted(set.union(*deepest)))
+        else:
+            path = ((root["name"], main_template),)
+        get_node(root, path)["constraints"] += 1
+        n_constraints += 1
+
+    finalize(root)
+    template_entries = sorted(aggregate_templates(root).values(), key=lambda entry: (entry["constraints"], entry["totalConstraints"]), reverse=True)
+    for entry in template_entries:
+        entry["share [%]"] = round(100 * entry["constraints"] / n_constraints, 2) if n_constraints > 0 else 0
+    return {"constraints": n_constraints, "signals": root["totalSignals"], "templates": template_entries, "hierarchy": root}
+
+# ========================================================================================================================
+# 4. Export
+
+def format_table(profile, top_n=20):
+    header = f"{'Template':<45}{'Instances':>10}{'Constraints':>14}{'Share [%]':>11}{'Incl. constraints':>19}{'Signals':>12}"
+    lines = [f"Total: {profile['constraints']} constraints, {profile['signals']} signals", header, "-" * len(header)]
+    for entry in profile["templates"][:top_n]:
+        lines.append(f"{str(entry['template']):<45}{entry['instances']:>10}{entry['constraints']:>14}{entry['share [%]']:>11}{entry['totalConstraints']:>19}{entry['signals']:>12}")
+    return "\n".join(lines)
+
+def export_profile(profile, output_prefix, top_n=20):
+    output_prefix = Path(output_prefix)
+    output_prefix.parent.mkdir(parents=True, exist_ok=True)
+    json_file = output_prefix.with_name(output_prefix.name + ".json")
+    table_file = output_prefix.with_name(output_prefix.name + ".txt")
+    with json_file.open("w") as f:
+        json.dump(profile, f, indent=4)
+    table = format_table(profile, top_n)
+    table_file.write_text(table + "\n")
+    print(table)
+    print(f"Constraint profile saved in '{json_file}' and '{table_file}'.")
+
+# ========================================================================================================================
+# MAIN
+
+def main():
+    parser = argparse.ArgumentParser(description="Attributes the constraints and signals of a compiled circuit to component instances and templates.")
+    parser.add_argument("circom", help="Circom file of the main component")
+    parser.add_argument("r1cs", help="R1CS file generated by circom")
+    parser.add_argument("sym", help="Symbols file generated by circom")
+    parser.add_argument("--output", help="Prefix of the output files (<output>.json and <output>.txt). Only prints the table if omitted.")
+    parser.add_argument("--top", type=int, default=20, help="Number of templates listed in the table")
+    args = parser.parse_args()
+
+    profile = profile_circuit(args.circom, args.r1cs, args.sym)
+    if args.output == None:
+        print(format_table(profile, args.top))
+    else:
+        export_profile(profile, args.output, args.top)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env node
+
+// Verifies many Groth16 proofs for the same verification key with randomized batch verification.
+// Follows the checks of snarkjs groth16 verify (https://github.com/iden3/snarkjs/blob/master/src/groth16_verify.js),
+// but combines the pairing equations e(A_i, B_i) = e(alpha, beta) * e(IC_i, gamma) * e(C_i, delta) of a batch
+// with random 128 bit factors r_i into a single pairing product
+//   prod_i e(-r_i*A_i, B_i) * e((sum_i r_i)*alpha, beta) * e(sum_i r_i*IC_i, gamma) * e(sum_i r_i*C_i, delta) = 1
+// that needs n+3 instead of 4n pairings and only one final exponentiation.
+// If a batch fails, it is split in halves until the invalid proofs are found.
+//
+// Usage: batchVerify.js <verification_key.json> [<batch_size>]
+// Reads one JSON object {"id": ..., "proof": {...}, "public": [...]} per line from stdin and
+// writes one JSON object {"id": ..., "valid": true|false, "error": ...} per proof to stdout.
+
+const crypto = require("crypto");
+const fs = require("fs");
+const path = require("path");
+const readline = require("readline");
+const { execSync } = require("child_process");
+
+function requireFfjavascript() {
+    try {
+        return require("ffjavascript");
+    } catch (e) {
+        // ffjavascript is a dependency of the globally installed snarkjs
+        const globalRoot = execSync("npm root -g").toString().trim();
+        return require(path.join(globalRoot, "snarkjs", "node_modules", "ffjavascript"));
+    }
+}
+
+const { getCurveFromName, utils, Scalar } = requireFfjavascript();
+
+async function loadVerificationKey(vkeyFile) {
+    const vk = utils.unstringifyBigInts(JSON.parse(fs.readFileSync(vkeyFile, "utf8")));
+    if (vk.protocol !== "groth16") {
+        throw new Error(`Batch verification is only supported for groth16 but the key is for ${vk.protocol}.`);
+    }
+    // Single threaded, the parallelism comes from running several worker processes (see src/benchmarks/batchVerify.py)
+    const curve = await getCurveFromName(vk.curve, true);
+    return {
+        curve,
+        nPublic: vk.nPublic,
+        IC: vk.IC.map((point) => curve.G1.fromObject(point)),
+        alpha: curve.G1.fromObject(vk.vk_alpha_1),
+        beta: curve.G2.fromObject(vk.vk_beta_2),
+        gamma: curve.G2.fromObject(vk.vk_gamma_2),
+        delta: curve.G2.fromObject(vk.vk_delta_2),
+    };
+}
+
+/**
+ * Parses a proof and its public signals. Returns an error message if they are malformed.
+ */
+function parseEntry(vk, entry) {
+    const curve = vk.curve;
+    if (entry.error !== undefined) {
+        return { error: entry.error };
+    }
+    try {
+        const proof = utils.unstringifyBigInts(entry.proof);
+        const publicSignals = utils.unstringifyBigInts(entry.public);
+        if (publicSignals.length !== vk.nPublic) {
+            return { error: `Expected ${vk.nPublic} public signals but got ${publicSignals.length}.` };
+        }
+        if (!publicSignals.every((signal) => Scalar.lt(signal, curve.r))) {
+            return { error: "Public signals are not in the scalar field." };
+        }
+        const A = curve.G1.fromObject(proof.pi_a);
+        const B = curve.G2.fromObject(proof.pi_b);
+        const C = curve.G1.fromObject(proof.pi_c);
+        if (!curve.G1.isValid(A) || !curve.G2.isValid(B) || !curve.G1.isValid(C)) {
+            return { error: "Proof is not well constructed." };
+        }
+        return { A, B, C, publicSignals };
+    } catch (e) {
+        return { error: `Proof could not be parsed: ${e.message}` };
+    }
+}
+
+function randomFactor() {
+    return Scalar.fromRprLE(crypto.randomBytes(16), 0, 16);
+}
+
+/**
+ * Checks the randomized pairing product for all proofs in the batch.
+ */
+async function checkBatch(vk, batch) {
+    const curve = vk.curve;
+    const G1 = curve.G1;
+    const pairs = [];
+    let rSum = Scalar.e(0);
+    let C = G1.zero;
+    // Coefficients of IC_1, ..., IC_n in sum_i r_i*IC_i
+    const w = new Uint8Array(curve.Fr.n8 * vk.nPublic);
+    const publicCoefficients = new Array(vk.nPublic).fill(Scalar.e(0));
+
+    for (const proof of batch) {
+        const r = randomFactor();
+        pairs.push(G1.neg(G1.timesScalar(proof.A, r)), proof.B);
+        C = G1.add(C, G1.timesScalar(proof.C, r));
+        rSum = Scalar.mod(Scalar.add(rSum, r), curve.r);
+        for (let j = 0; j < vk.nPublic; j++) {
+            publicCoefficients[j] = Scalar.mod(Scalar.add(publicCoefficients[j], Scalar.mul(r, proof.publicSignals[j])), curve.r);
+        }
+    }
+
+    const IC = new Uint8Array(G1.F.n8 * 2 * vk.nPublic);
+    for (let j = 0; j < vk.nPublic; j++) {
+        IC.set(G1.toAffine(vk.IC[j + 1]), j * G1.F.n8 * 2);
+        Scalar.toRprLE(w, curve.Fr.n8 * j, publicCoefficients[j], curve.Fr.n8);
+    }
+    let cpub = vk.nPublic > 0 ? await G1.multiExpAffine(IC, w) : G1.zero;
+    cpub = G1.add(cpub, G1.timesScalar(vk.IC[0], rSum));
+
+    pairs.push(G1.timesScalar(vk.alpha, rSum), vk.beta, cpub, vk.gamma, C, vk.delta);
+    return await curve.pairingEq(...pairs);
+}
+
+/**
+ * Returns the indices of all invalid proofs in the batch by recursively splitting failing batches.
+ */
+async function findInvalid(vk, batch, offset = 0) {
+    if (batch.length === 0 || await checkBatch(vk, batch)) {
+        return [];
+    }
+    if (batch.length === 1) {
+        return [offset];
+    }
+    const middle = Math.ceil(batch.length / 2);
+    return (await findInvalid(vk, batch.slice(0, middle), offset))
+        .concat(await findInvalid(vk, batch.slice(middle), offset + middle));
+}
+
+async function verifyBatch(vk, entries) {
+    const parsed = entries.map((entry) => parseEntry(vk, entry));
+    const wellFormed = parsed.map((p, i) => i).filter((i) => parsed[i].error === undefined);
+    const invalid = new Set((await findInvalid(vk, wellFormed.map((i) => parsed[i]))).map((k) => wellFormed[k]));
+    for (let i = 0; i < entries.length; i++) {
+        const result = { id: entries[i].id, valid: parsed[i].error === undefined && !invalid.has(i) };
+        if (parsed[i].error !== undefined) {
+            result.error = parsed[i].error;
+        } else if (invalid.has(i)) {
+            result.error = "Pairing check failed.";
+        }
+        process.stdout.write(JSON.stringify(result) + "\n");
+    }
+}
+
+async function main() {
+    if (process.argv.length < 3) {
+        console.error("Usage: batchVerify.js <verification_key.json> [<batch_size>]");
+        process.exit(1);
+    }
+    const vk = await loadVerificationKey(process.argv[2]);
+    const batchSize = process.argv.length > 3 ? parseInt(process.argv[3]) : 64;
+
+    let batch = [];
+    let lineNumber = 0;
+    const lines = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+    for await (const line of lines) {
+        lineNumber++;
+        if (line.trim() === "") {
+            continue;
+        }
+        try {
+            batch.push(JSON.parse(line));
+        } catch (e) {
+            // Reported as invalid proof instead of terminating the worker
+            batch.push({ id: `line ${lineNumber}`, error: `Line could not be parsed: ${e.message}` });
+        }
+        if (batch.length >= batchSize) {
+            await verifyBatch(vk, batch);
+            batch = [];
+        }
+    }
+    await verifyBatch(vk, batch);
+    await vk.curve.terminate();
+}
+
+main().catch((e) => {
+    console.error(e);
+    process.exit(1);
+});